@@ -1,5 +1,11 @@
+from functools import lru_cache
+
+import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
+import pyarrow.dataset as ds
+
+from datos import preparar_parquet
 
 
 # Este diccionario es usado para limpiar los nombres
@@ -22,6 +28,16 @@ NOMBRES = {
     "Cd. Juarez": "Cd. Juárez",
 }
 
+# Versión del diccionario anterior con las llaves en minúsculas.
+# Así podemos buscar los nombres sin convertirlos a formato de título.
+NOMBRES_MINUSCULAS = {k.lower(): v for k, v in NOMBRES.items()}
+
+# Este diccionario relaciona cada opción con su valor en el dataset.
+OPCIONES = {
+    "operaciones": "OPERACIONES/ FLIGHTS",
+    "pasajeros": "PASAJEROS/PASSENGERS",
+}
+
 MESES = [
     "ENE/JAN",
     "FEB/FEB",
@@ -60,26 +76,46 @@ def main(primer_año, segundo_año, opcion, aeropuerto):
 
     """
 
-    # Cargamos el dataset de estadísticas operativas.
-    df = pd.read_csv("./data.csv")
+    # Cargamos las estadísticas operativas del aeropuerto. Estos registros
+    # ya vienen filtrados por aeropuerto desde la lectura.
+    df = cargar_datos(aeropuerto)
+
+    # Filtramos por la opción y los años que nos interesan.
+    # Ambas condiciones se combinan en una sola máscara para
+    # seleccionar los registros de una sola vez.
+    años = df["AÑO / YEAR"].to_numpy()
+
+    df = df[
+        (df["OPCIONES/ OPTIONS"] == OPCIONES[opcion])
+        & ((años == primer_año) | (años == segundo_año))
+    ]
 
-    # Filtramos por el aeropuerto que nos interesa.
-    df = df[df["AEROPUERTO / AIRPORT"] == aeropuerto]
+    # Si ambos años son iguales solo tendremos una columna.
+    etiquetas = list(dict.fromkeys([primer_año, segundo_año]))
 
-    # Dependiendo de la opción, es el filtro que se usará y el título.
-    if opcion == "operaciones":
-        df = df[df["OPCIONES/ OPTIONS"] == "OPERACIONES/ FLIGHTS"]
-    elif opcion == "pasajeros":
-        df = df[df["OPCIONES/ OPTIONS"] == "PASAJEROS/PASSENGERS"]
+    # Si no hay registros para alguno de los años (o para el aeropuerto)
+    # no generamos una gráfica vacía.
+    faltantes = [año for año in etiquetas if año not in df["AÑO / YEAR"].to_numpy()]
 
-    # Transformamos nuestro DataFrame.
-    df = df.groupby("AÑO / YEAR").sum(numeric_only=True)[MESES].transpose()
+    if faltantes:
+        raise KeyError(f"No hay registros de {opcion} en {aeropuerto} para {faltantes}")
+
+    # Transformamos nuestro DataFrame. Como ya sabemos que el resultado
+    # tiene 12 meses y a lo más 2 años, acumulamos los registros directamente
+    # en un arreglo de ese tamaño.
+    valores = np.nan_to_num(df[MESES].to_numpy(dtype=float))
+    columnas = np.where(df["AÑO / YEAR"].to_numpy() == primer_año, 0, 1)
+
+    totales = np.zeros((len(etiquetas), len(MESES)))
+    np.add.at(totales, columnas, valores)
+
+    df = pd.DataFrame(totales.T, index=MESES, columns=etiquetas)
 
     # Le damos formato al nombre del mes.
     df.index = df.index.map(lambda x: f"{x[:3].title()}.")
 
     # Limpiamos el nombre del aeropuerto.
-    aeropuerto = NOMBRES.get(aeropuerto.title(), aeropuerto.title())
+    aeropuerto = NOMBRES_MINUSCULAS.get(aeropuerto.lower()) or aeropuerto.title()
 
     # Vamos a crear dos gráficas de barras sobre el mismo lienzo.
     # Una gráfica para cada año.
@@ -89,7 +125,7 @@ def main(primer_año, segundo_año, opcion, aeropuerto):
         go.Bar(
             x=df.index,
             y=df[primer_año],
-            text=df[primer_año].apply(formatear_texto),
+            text=formatear_texto(df[primer_año]),
             name=f"<b>{primer_año}</b> (total: <b>{df[primer_año].sum():,.0f}</b>)",
             textposition="outside",
             marker_color="rgb(229, 134, 6)",
@@ -103,7 +139,7 @@ def main(primer_año, segundo_año, opcion, aeropuerto):
         go.Bar(
             x=df.index,
             y=df[segundo_año],
-            text=df[segundo_año].apply(formatear_texto),
+            text=formatear_texto(df[segundo_año]),
             name=f"<b>{segundo_año}</b> (total: <b>{df[segundo_año].sum():,.0f}</b>)",
             textposition="outside",
             marker_color="rgb(82, 188, 163)",
@@ -128,12 +164,9 @@ def main(primer_año, segundo_año, opcion, aeropuerto):
     )
 
     # Detectamos el valor máximo para poder ajustar la
-    # escala vertical.
-    valor_max = (
-        df[primer_año].max()
-        if df[primer_año].max() >= df[segundo_año].max()
-        else df[segundo_año].max()
-    )
+    # escala vertical. El DataFrame solo tiene las columnas
+    # de ambos años, así que basta con una sola reducción.
+    valor_max = df.to_numpy().max()
 
     fig.update_yaxes(
         title=f"Total de {opcion} mensuales",
@@ -213,20 +246,51 @@ def main(primer_año, segundo_año, opcion, aeropuerto):
     fig.write_image(f"./comparacion_{opcion}_{aeropuerto}.png")
 
 
-def formatear_texto(x):
+@lru_cache(maxsize=1)
+def cargar_datos(aeropuerto):
+    """
+    Carga los registros de un aeropuerto desde la versión
+    en Parquet del dataset de la AFAC.
+
+    El filtro se aplica durante la lectura, por lo que solo
+    se cargan los registros que nos interesan. Las siguientes
+    llamadas con el mismo aeropuerto reutilizan el DataFrame.
+    """
+
+    columnas = ["OPCIONES/ OPTIONS", "AÑO / YEAR", *MESES]
+
+    # Generamos el archivo Parquet si hace falta.
+    preparar_parquet(["AEROPUERTO / AIRPORT", *columnas])
+
+    # Solo leemos las columnas que usa la gráfica.
+    tabla = ds.dataset("./data.parquet").to_table(
+        columns=columnas,
+        filter=ds.field("AEROPUERTO / AIRPORT") == aeropuerto,
+    )
+
+    return tabla.to_pandas()
+
+
+def formatear_texto(valores):
     """
     Esta función le da formato a las cifras
     para facilitar su lectura.
+
+    Los rangos de cada cifra se evalúan de forma
+    vectorizada y se regresa una lista de textos.
     """
 
-    if x >= 1000000:
-        return f"{x/1000000:,.2f}M"
-    elif x >= 100000:
-        return f"{x/1000:,.0f}k"
-    elif x >= 10000:
-        return f"{x/1000:,.1f}k"
-    else:
-        return f"{x:,.0f}"
+    valores = np.asarray(valores, dtype=float)
+
+    rangos = [valores >= 1000000, valores >= 100000, valores >= 10000]
+
+    escalas = np.select(rangos, [1000000, 1000, 1000], 1)
+    formatos = np.select(rangos, ["{:,.2f}M", "{:,.0f}k", "{:,.1f}k"], "{:,.0f}")
+
+    return [
+        formato.format(valor / escala)
+        for formato, valor, escala in zip(formatos, valores, escalas)
+    ]
 
 
 if __name__ == "__main__":
@@ -0,0 +1,57 @@
+"""
+Funciones compartidas para cargar el dataset de la AFAC
+desde su versión en Parquet.
+"""
+
+import os
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+
+def preparar_parquet(columnas):
+    """
+    Genera la versión en Parquet del CSV de la AFAC cuando hace falta.
+
+    El archivo se vuelve a generar si no existe, si el CSV es más
+    reciente o si le falta alguna de las columnas que se van a leer.
+
+    Parameters
+    ----------
+    columnas : list
+        Las columnas que se van a leer del archivo Parquet.
+
+    """
+
+    if (
+        not os.path.exists("./data.parquet")
+        or os.path.getmtime("./data.parquet") < os.path.getmtime("./data.csv")
+        or not set(columnas).issubset(pq.read_schema("./data.parquet").names)
+    ):
+        convertir_a_parquet()
+
+
+def convertir_a_parquet():
+    """
+    Convierte el CSV de la AFAC a Parquet para
+    poder filtrarlo durante la lectura.
+    """
+
+    # Usamos el lector de PyArrow y guardamos las columnas de texto
+    # repetitivo como categorías para que los filtros sean más ligeros.
+    df = pd.read_csv(
+        "./data.csv",
+        engine="pyarrow",
+        dtype={
+            "AEROPUERTO / AIRPORT": "category",
+            "OPCIONES/ OPTIONS": "category",
+            "TIPO/ TYPE": "category",
+        },
+    )
+
+    # Ordenamos por aeropuerto para que cada grupo de filas contenga
+    # pocos aeropuertos. Así el filtro por aeropuerto de
+    # comparacion_anual.py puede descartar el resto sin leerlos.
+    df = df.sort_values("AEROPUERTO / AIRPORT")
+
+    df.to_parquet("./data.parquet", index=False, row_group_size=512)
@@ -2,9 +2,7 @@
 Fuente: https://www.gob.mx/afac/acciones-y-programas/estadisticas-280404/
 """
 
-import random
-from datetime import datetime
-
+import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
 from statsmodels.tsa.seasonal import STL
@@ -25,6 +23,16 @@ MESES = {
     "DIC/DEC": 12,
 }
 
+# Este diccionario relaciona cada tipo de información con su valor en el dataset.
+OPCIONES = {
+    "PASAJEROS": "PASAJEROS/PASSENGERS",
+    "OPERACIONES": "OPERACIONES/ FLIGHTS",
+}
+
+# Lista con los nombres de las columnas de meses, la usamos para
+# seleccionar columnas sin reconstruirla en cada llamada.
+COLUMNAS_MESES = list(MESES)
+
 NOMBRES = {
     "Ciudad De México/Mexico City": "Ciudad de México",
     "Tuxtla Gutierrez (Angel Albino Corzo)": "Tuxtla Gutiérrez",
@@ -43,6 +51,10 @@ NOMBRES = {
     "Cd. Juarez": "Cd. Juárez",
 }
 
+# Versión del diccionario anterior con las llaves en minúsculas.
+# Así podemos buscar los nombres sin convertirlos a formato de título.
+NOMBRES_MINUSCULAS = {k.lower(): v for k, v in NOMBRES.items()}
+
 
 def main():
     """
@@ -51,15 +63,16 @@ def main():
     """
 
     # Cargamos el dataset de la AFAC.
-    df = pd.read_csv("./data.csv")
+    df = cargar_datos()
 
     # Seleccionamos un aeropuerto al azar.
-    aeropuertos = df["AEROPUERTO / AIRPORT"].unique()
-    aeropuerto = random.choice(aeropuertos)
+    # Como la columna es categórica, la lista de aeropuertos ya está
+    # disponible en sus categorías y no hay que buscar valores únicos.
+    aeropuertos = df["AEROPUERTO / AIRPORT"].cat.categories.to_numpy()
+    aeropuerto = np.random.default_rng().choice(aeropuertos)
 
     # Generamos las series de tiempo del aeropuerto seleccionado.
-    data = extraer_series_de_tiempo(df, aeropuerto, "PASAJEROS")
-    data2 = extraer_series_de_tiempo(df, aeropuerto, "OPERACIONES")
+    data, data2 = extraer_series_de_tiempo(df, aeropuerto)
 
     # Calculamos las tendencias.
     data["NACIONAL/DOMESTIC_trend"] = STL(data["NACIONAL/DOMESTIC"]).fit().trend
@@ -79,8 +92,7 @@ def main():
     data2 = data2.tail(meses)
 
     # Limpiamos el nombre del aeropuerto, ya que algunos no vienen con acentos.
-    aeropuerto = aeropuerto.title()
-    aeropuerto = NOMBRES.get(aeropuerto, aeropuerto)
+    aeropuerto = NOMBRES_MINUSCULAS.get(aeropuerto.lower()) or aeropuerto.title()
 
     # Vamos a crear 4 gráficas de linea, estas serán para pasajeros
     # y operaciones de origen nacional e internacional.
@@ -120,6 +132,9 @@ def main():
 def graficar(df, df_tendencia, aeropuerto, tipo, origen):
     """
     Esta función crea dos gráficas de línea, una con las cifras absolutas y una con el promedio móvil.
+
+    Los valores se envían a Plotly como float32 para reducir
+    el tamaño de la figura que se serializa para Kaleido.
     """
 
     fig = go.Figure()
@@ -127,20 +142,19 @@ def graficar(df, df_tendencia, aeropuerto, tipo, origen):
     fig.add_trace(
         go.Scatter(
             x=df.index,
-            y=df.values,
+            y=np.asarray(df.values, dtype=np.float32),
             name="Cifras absolutas",
             mode="lines",
             line_color="#18ffff",
             opacity=1.0,
             line_width=4,
-            line_shape="spline",
         )
     )
 
     fig.add_trace(
         go.Scatter(
             x=df_tendencia.index,
-            y=df_tendencia.values,
+            y=np.asarray(df_tendencia.values, dtype=np.float32),
             name="Tendencia (12 periodos)",
             mode="lines",
             line_color="#ffca28",
@@ -182,6 +196,7 @@ def graficar(df, df_tendencia, aeropuerto, tipo, origen):
         legend_borderwidth=1,
         legend_bordercolor="#FFFFFF",
         showlegend=True,
+        hovermode="x",
         legend_x=0.01,
         legend_y=0.98,
         legend_xanchor="left",
@@ -234,43 +249,81 @@ def graficar(df, df_tendencia, aeropuerto, tipo, origen):
     fig.write_image(f"./imgs/{tipo}_{origen}.png")
 
 
-def extraer_series_de_tiempo(df, aeropuerto, tipo):
-    """
-    Genera series de tiempo de un aeropuerto.
+def cargar_datos():
     """
+    Carga el dataset de la AFAC directamente desde el CSV.
 
-    lista_df = list()
+    Solo leemos las columnas que usamos. El aeropuerto, la opción
+    y el tipo vienen como categorías para que los filtros comparen
+    códigos enteros en lugar de textos.
+    """
 
-    # Filtrar por aeropuerto y tipo de información.
-    df = df[df["AEROPUERTO / AIRPORT"] == aeropuerto]
-    df = df[df["OPCIONES/ OPTIONS"].str.contains(tipo)]
+    return pd.read_csv(
+        "./data.csv",
+        usecols=[
+            "AEROPUERTO / AIRPORT",
+            "OPCIONES/ OPTIONS",
+            "AÑO / YEAR",
+            "TIPO/ TYPE",
+            *COLUMNAS_MESES,
+        ],
+        dtype={
+            "AEROPUERTO / AIRPORT": "category",
+            "OPCIONES/ OPTIONS": "category",
+            "TIPO/ TYPE": "category",
+        },
+    )
 
-    # iteramos sobre cada año disponible.
-    for año in df["AÑO / YEAR"].unique():
-        # Seleccionamos el año de la iteración.
-        temp_df = df[df["AÑO / YEAR"] == año]
 
-        # Agrupamos por tipo de pasajero.
-        temp_df = temp_df.groupby("TIPO/ TYPE").sum()
+def extraer_series_de_tiempo(df, aeropuerto):
+    """
+    Genera las series de tiempo de pasajeros y
+    operaciones de un aeropuerto.
 
-        # Seleccionamos solo las columnas de meses y volteamos el DataFrame
-        # para que los meses sean el nuevo índice.
-        temp_df = temp_df[MESES.keys()].transpose()
+    Ambas series se obtienen de una sola agrupación
+    sobre los registros del aeropuerto.
+    """
 
-        # Convertimos el índice a DateTimeIndex.
-        temp_df.index = temp_df.index.map(lambda x: datetime(año, MESES[x], 1))
+    # Filtrar por aeropuerto. Comparamos directamente los códigos
+    # enteros de la columna categórica.
+    columna = df["AEROPUERTO / AIRPORT"]
+    codigo = columna.cat.categories.get_loc(aeropuerto)
+    df = df[columna.cat.codes.to_numpy() == codigo]
+
+    # Sumamos los meses de cada tipo de información, año y tipo de
+    # pasajero en una sola agrupación.
+    final = df.groupby(
+        ["OPCIONES/ OPTIONS", "AÑO / YEAR", "TIPO/ TYPE"], observed=True, sort=False
+    )[COLUMNAS_MESES].sum()
+
+    # Volteamos el DataFrame para que cada renglón sea un año y mes
+    # y cada columna un tipo de pasajero.
+    final = final.stack().unstack("TIPO/ TYPE")
+
+    # Traducimos los nombres de los meses a números. Solo se traducen
+    # los 12 valores únicos del índice y no cada uno de los renglones.
+    final.index = final.index.set_levels(final.index.levels[2].map(MESES), level=2)
+
+    # Convertimos los años y meses del índice a fechas en una sola operación.
+    fechas = pd.to_datetime(
+        pd.DataFrame(
+            {
+                "year": final.index.get_level_values(1),
+                "month": final.index.get_level_values(2),
+                "day": 1,
+            }
+        )
+    )
 
-        # Agregamos el DataFrame temporal a la lista de DataFrames.
-        lista_df.append(temp_df)
+    final.index = pd.MultiIndex.from_arrays([final.index.get_level_values(0), fechas])
 
-    # Unimos todos los DataFrames.
-    final = pd.concat(lista_df)
+    # Ordenamos los registros de forma cronológica.
+    final = final.sort_index()
 
-    # Agregamos una columna para el total y filtramos los registros en ceros.
-    final["total"] = final.sum(axis=1)
-    final = final[final["total"] != 0]
+    # Filtramos los registros en ceros sin calcular una columna de totales.
+    final = final[(np.nan_to_num(final.to_numpy()) != 0).any(axis=1)]
 
-    return final
+    return final.xs(OPCIONES["PASAJEROS"]), final.xs(OPCIONES["OPERACIONES"])
 
 
 if __name__ == "__main__":
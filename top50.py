@@ -1,6 +1,11 @@
+import math
+
 import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
+import plotly.io as pio
+
+from datos import preparar_parquet
 
 
 # Este diccionario es usado para limpiar los nombres
@@ -24,13 +29,77 @@ NOMBRES = {
 }
 
 
-def main(año, opcion, color):
+# Esta plantilla contiene el diseño que comparten todas las gráficas,
+# así solo se construye y valida una vez. La combinamos con la plantilla
+# por defecto para conservar el resto de sus estilos.
+pio.templates["top50"] = pio.templates.merge_templates(
+    "plotly",
+    go.layout.Template(
+        layout=dict(
+            # Para hacer la letra más grande utilizamos
+            # las propiedades de uniformtext.
+            uniformtext_mode="show",
+            uniformtext_minsize=18,
+            showlegend=False,
+            width=1280,
+            height=1600,
+            font_family="Lato",
+            font_color="#FFFFFF",
+            font_size=18,
+            title_x=0.5,
+            title_y=0.985,
+            margin_t=60,
+            margin_r=40,
+            margin_b=80,
+            margin_l=220,
+            title_font_size=26,
+            plot_bgcolor="#18122B",
+            paper_bgcolor="#393053",
+            xaxis=dict(
+                type="log",
+                separatethousands=True,
+                tickfont_size=14,
+                ticks="outside",
+                ticklen=10,
+                zeroline=False,
+                tickcolor="#FFFFFF",
+                linewidth=2,
+                showline=True,
+                gridwidth=0.35,
+                mirror=True,
+                nticks=20,
+            ),
+            yaxis=dict(
+                autorange="reversed",
+                ticks="outside",
+                separatethousands=True,
+                ticklen=10,
+                title_standoff=6,
+                tickcolor="#FFFFFF",
+                linewidth=2,
+                gridwidth=0.35,
+                showgrid=False,
+                showline=True,
+                mirror=True,
+            ),
+        )
+    ),
+)
+
+
+def main(df, internacional, año, opcion, color):
     """
     Genera una gráfica de barras con el top 50
     de registros.
 
     Parameters
     ----------
+    df : pandas.DataFrame
+        Los registros del año que nos interesa graficar.
+
+    internacional : pandas.Categorical
+        Los aeropuertos que tuvieron tráfico internacional.
+
     año : int
         El año que nos interesa graficar.
 
@@ -42,62 +111,63 @@ def main(año, opcion, color):
 
     """
 
-    # Cargamos el dataset de estadísticas operativas.
-    df = pd.read_csv("./data.csv")
-
-    # Filtramos por el Año que nos interesa.`
-    df = df[df["AÑO / YEAR"] == año]
-
-    # Seleccionamos los aeropuertos que tuvieron tráfico internacional.
-    internacional = df[
-        (df["TIPO/ TYPE"] == "INTERNACIONAL/ INTERNATIONAL")
-        & (df["OPCIONES/ OPTIONS"] == "OPERACIONES/ FLIGHTS")
-        & (df["TOTAL/TOTAL"] != 0)
-    ]
-
-    # Limpiamos los nombres de los aeropuertos con tráfico internacional.
-    internacional = [
-        NOMBRES.get(item.title(), item.title())
-        for item in internacional["AEROPUERTO / AIRPORT"].unique()
-    ]
-
     # Dependiendo de la opción creamos filtros y textos específicos.
     if opcion == "operaciones":
-        df = df[df["OPCIONES/ OPTIONS"] == "OPERACIONES/ FLIGHTS"]
+        filtro = "OPERACIONES/ FLIGHTS"
         titulo = f"Los 50 aeropuertos de México con mayor número de operaciones durante el {año}"
         nota = "<b>Notas:</b><br>El 🌎 indica que el aeropuerto recibió tráfico internacional.<br>Una operación puede ser un aterrizaje o un despegue.<br>Las cifras incluyen operaciones nacionales e internacionales."
     elif opcion == "pasajeros":
-        df = df[df["OPCIONES/ OPTIONS"] == "PASAJEROS/PASSENGERS"]
+        filtro = "PASAJEROS/PASSENGERS"
         titulo = f"Los 50 aeropuertos de México con mayor número de pasajeros durante el {año}"
         nota = "<b>Notas:</b><br>El 🌎 indica que el aeropuerto recibió tráfico internacional.<br>Las cifras incluyen pasajeros nacionales y extranjeros."
 
-    # Transformamos el DataFrame usando solo las columnas necesarias.
-    df = df.pivot_table(
-        index="AEROPUERTO / AIRPORT",
-        columns="TIPO/ TYPE",
-        values="TOTAL/TOTAL",
-        aggfunc="sum",
+    # Filtramos por la opción y descartamos las columnas que ya no
+    # se usan antes de agrupar.
+    df = df.loc[
+        df["OPCIONES/ OPTIONS"] == filtro,
+        ["AEROPUERTO / AIRPORT", "TIPO/ TYPE", "TOTAL/TOTAL"],
+    ]
+
+    # Transformamos el DataFrame.
+    df = (
+        df.groupby(["AEROPUERTO / AIRPORT", "TIPO/ TYPE"], observed=True)["TOTAL/TOTAL"]
+        .sum()
+        .unstack("TIPO/ TYPE")
     )
 
-    # Limpiamos el nombre del aeropuerto.
-    df.index = df.index.str.title().map(lambda x: NOMBRES.get(x, x))
+    # Limpiamos el nombre del aeropuerto renombrando las categorías
+    # del índice, así cada nombre se procesa una sola vez.
+    categorias = df.index.categories
+    nombres = categorias.str.title().to_series().replace(NOMBRES).to_numpy()
 
     # Agregamos un emoji de 🌎 para los aeropuertos con tráfico internacional.
-    df.index = df.index.map(lambda x: f"{x} 🌎" if x in internacional else x)
+    # Para identificarlos usamos sus nombres originales, antes de limpiarlos.
+    df.index = df.index.rename_categories(
+        np.where(categorias.isin(internacional), nombres + " 🌎", nombres)
+    )
 
-    # Sumamos ambos tipos de operaciones/pasajeros.
-    df["total"] = df.sum(axis=1)
+    # Sumamos ambos tipos de operaciones/pasajeros directamente
+    # sobre el arreglo. Los aeropuertos sin uno de los tipos tienen NaN.
+    df["total"] = np.nansum(df.to_numpy(), axis=1)
 
-    # Calculamos la razón para determinar la posición del texto.
-    df["ratio"] = np.log10(df["total"]) / np.log10(df["total"].max())
+    # Seleccionamos los 50 totales más altos, ordenados de mayor a menor.
+    # Los siguientes cálculos solo se hacen sobre estos registros.
+    df = df.nlargest(50, "total")
 
-    df["text_pos"] = df["ratio"].apply(lambda x: "outside" if x <= 0.97 else "inside")
+    # Como los totales ya están ordenados, el máximo y el mínimo
+    # son el primer y el último registro. Sus logaritmos los
+    # reutilizamos para la razón y para la escala horizontal.
+    totales = df["total"].to_numpy()
+    log_max = math.log10(totales[0])
+    log_min = math.log10(totales[-1])
 
-    # Ordenamos los totales de mayor a menor.
-    df.sort_values("total", ascending=False, inplace=True)
+    # Calculamos la razón para determinar la posición del texto.
+    logaritmos = np.log10(totales)
 
-    # Nos limitamos al top 50.
-    df = df.head(50)
+    # Ambos valores solo se usan en la gráfica, así que los guardamos
+    # como arreglos en lugar de agregarlos como columnas.
+    ratio = logaritmos / log_max
+    text_pos = np.where(ratio <= 0.97, "outside", "inside")
 
     fig = go.Figure()
 
@@ -105,11 +175,11 @@ def main(año, opcion, color):
     # conlos valores antes calculados.
     fig.add_trace(
         go.Bar(
-            y=df.index,
-            x=df["total"],
-            text=df["total"],
+            y=df.index.to_numpy(),
+            x=totales,
+            text=totales,
             texttemplate=" %{text:,.0f} ",
-            textposition=df["text_pos"],
+            textposition=text_pos,
             orientation="h",
             marker_color=color,
             marker_line_width=0,
@@ -120,56 +190,13 @@ def main(año, opcion, color):
     )
 
     fig.update_xaxes(
-        type="log",
-        range=[np.log10(df["total"].min()) // 1, np.log10(df["total"].max() * 1.02)],
-        separatethousands=True,
-        tickfont_size=14,
-        ticks="outside",
-        ticklen=10,
-        zeroline=False,
-        tickcolor="#FFFFFF",
-        linewidth=2,
-        showline=True,
-        gridwidth=0.35,
-        mirror=True,
-        nticks=20,
-    )
-
-    # Para hacer la letra más grande utilizamos
-    # las propiedades de uniformtext.
-    fig.update_yaxes(
-        autorange="reversed",
-        ticks="outside",
-        separatethousands=True,
-        ticklen=10,
-        title_standoff=6,
-        tickcolor="#FFFFFF",
-        linewidth=2,
-        gridwidth=0.35,
-        showgrid=False,
-        showline=True,
-        mirror=True,
+        range=[math.floor(log_min), log_max + math.log10(1.02)],
     )
 
+    # El resto del diseño viene de la plantilla top50.
     fig.update_layout(
-        uniformtext_mode="show",
-        uniformtext_minsize=18,
-        showlegend=False,
-        width=1280,
-        height=1600,
-        font_family="Lato",
-        font_color="#FFFFFF",
-        font_size=18,
+        template="top50",
         title_text=titulo,
-        title_x=0.5,
-        title_y=0.985,
-        margin_t=60,
-        margin_r=40,
-        margin_b=80,
-        margin_l=220,
-        title_font_size=26,
-        plot_bgcolor="#18122B",
-        paper_bgcolor="#393053",
         annotations=[
             dict(
                 x=0.99,
@@ -219,6 +246,65 @@ def main(año, opcion, color):
     fig.write_image(f"./{opcion}_{año}.png")
 
 
+def obtener_internacionales(df):
+    """
+    Obtiene los aeropuertos que tuvieron tráfico internacional.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        Los registros del año que nos interesa graficar.
+
+    Returns
+    -------
+    pandas.Categorical
+        Los nombres originales de los aeropuertos.
+
+    """
+
+    # Solo extraemos la columna del aeropuerto, sin copiar el resto.
+    return df.loc[
+        (df["TIPO/ TYPE"] == "INTERNACIONAL/ INTERNATIONAL")
+        & (df["OPCIONES/ OPTIONS"] == "OPERACIONES/ FLIGHTS")
+        & (df["TOTAL/TOTAL"] != 0),
+        "AEROPUERTO / AIRPORT",
+    ].unique()
+
+
+def cargar_datos(año):
+    """
+    Carga los registros de un año del dataset de la AFAC
+    desde su versión en Parquet, la cual se genera a partir
+    del CSV cuando hace falta.
+    """
+
+    columnas = [
+        "AEROPUERTO / AIRPORT",
+        "OPCIONES/ OPTIONS",
+        "AÑO / YEAR",
+        "TIPO/ TYPE",
+        "TOTAL/TOTAL",
+    ]
+
+    # Generamos el archivo Parquet si hace falta.
+    preparar_parquet(columnas)
+
+    # Solo leemos las columnas que usa la gráfica. El archivo está ordenado
+    # por aeropuerto y cada grupo de filas contiene todos los años, así que
+    # el filtro del año no evita leer ningún grupo: las filas se descartan
+    # después de decodificarlas, antes de crear el DataFrame.
+    return pd.read_parquet(
+        "./data.parquet",
+        columns=columnas,
+        filters=[("AÑO / YEAR", "==", año)],
+    )
+
+
 if __name__ == "__main__":
-    main(2023, "operaciones", "#fc4103")
-    main(2023, "pasajeros", "#fc036b")
+    # Cargamos y filtramos los registros una sola vez para ambas gráficas,
+    # al igual que la lista de aeropuertos con tráfico internacional.
+    df = cargar_datos(2023)
+    internacional = obtener_internacionales(df)
+
+    main(df, internacional, 2023, "operaciones", "#fc4103")
+    main(df, internacional, 2023, "pasajeros", "#fc036b")